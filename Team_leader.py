@@ -1,15 +1,20 @@
-from typing import Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 from agno.agent import Agent
 from agno.models.groq import Groq
 from agno.team.team import Team
 from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.tools.yfinance import YFinanceTools
 from agno.tools.reasoning import ReasoningTools
 from agno.storage.sqlite import SqliteStorage
-from agno.tools.openbb import OpenBBTools
+from agno.utils.log import logger
 from uuid import uuid4
 from agno.tools.calculator import CalculatorTools
+from groq import Groq as GroqClient
+from sqlalchemy import func, select
+from portfolio_tools import PortfolioTools
+from price_store import PriceHistoryTools
+from prefetch import PrefetchedOpenBBTools, PrefetchedYFinanceTools
 
 agent_model_id = "llama-3.3-70b-versatile"
 #the following modles are also available:
@@ -26,6 +31,12 @@ web_agent_model_id = "llama-3.3-70b-versatile"
 # Groq API key
 Groq_api_key = "your_groq_api_key_here"  # replace with your Groq API key :D
 
+# Shared, immutable resources: one Groq HTTP client (connection pool) for all member agents of all teams.
+# Tool results are cached on disk (cache_results=True) and the cache key only depends on the
+# function name and arguments, so every team reuses the same tool cache.
+# Agents, models and toolkits hold per-run state (memory, run_response, functions) and are built per team.
+groq_client = GroqClient(api_key=Groq_api_key)
+
 
 '''
 Calculator Agent:
@@ -33,32 +44,33 @@ Calculator Agent:
 instructions have been tested in different scenarios and are designed to be clear and concise.
 intructions are designed based on the Agno GitHub repository and the Agno documentation.
 '''
-calculator_agent = Agent(
-    name="Calculator Agent",
-    role="Perform mathematical calculations",
-    model=Groq(id=agent_model_id, api_key=Groq_api_key),
-    description="You are a calculator agent. Perform calculations based on user requests.", 
-    instructions=[
-        "You are a calculator agent. Perform calculations based on user requests.",
-        "Use the tools provided to perform calculations.",
-        "Only output the final answer, no other text.",
-    ],
-    tools=[
-        CalculatorTools(
-            add=True,
-            subtract=True,
-            multiply=True,
-            divide=True,
-            exponentiate=True,
-            factorial=True,
-            is_prime=True,
-            square_root=True,
-            cache_results=True,            
-        ),
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
+def get_calculator_agent() -> Agent:
+    return Agent(
+        name="Calculator Agent",
+        role="Perform mathematical calculations",
+        model=Groq(id=agent_model_id, api_key=Groq_api_key, client=groq_client),
+        description="You are a calculator agent. Perform calculations based on user requests.", 
+        instructions=[
+            "You are a calculator agent. Perform calculations based on user requests.",
+            "Use the tools provided to perform calculations.",
+            "Only output the final answer, no other text.",
+        ],
+        tools=[
+            CalculatorTools(
+                add=True,
+                subtract=True,
+                multiply=True,
+                divide=True,
+                exponentiate=True,
+                factorial=True,
+                is_prime=True,
+                square_root=True,
+                cache_results=True,            
+            ),
+        ],
+        show_tool_calls=True,
+        markdown=True,
+    )
 
 
 '''
@@ -69,68 +81,120 @@ Web Agent:
 instructions are designed to be clear and concise.
 instructions are designed based on the Agno GitHub repository and the Agno documentation.
 '''
-web_agent = Agent(
-    name="Web Search Agent",
-    role="Handle web search requests",
-    model=Groq(id=web_agent_model_id if web_agent_model_id else agent_model_id , api_key=Groq_api_key),
-    tools=[DuckDuckGoTools(cache_results=True)],
-    description = "You are a web search agent. Find information on the web.",
-    instructions=[
-                "Always include sources",
-                "Search 'tradingview + Stock symbol + chart' to find the link to the chart of company",
-                "Only output the final answer, no other text.",
-                 ],
-    add_datetime_to_instructions=True,
-    show_tool_calls=True,
-)
+def get_web_agent() -> Agent:
+    return Agent(
+        name="Web Search Agent",
+        role="Handle web search requests",
+        model=Groq(id=web_agent_model_id if web_agent_model_id else agent_model_id , api_key=Groq_api_key, client=groq_client),
+        tools=[DuckDuckGoTools(cache_results=True)],
+        description = "You are a web search agent. Find information on the web.",
+        instructions=[
+                    "Always include sources",
+                    "Search 'tradingview + Stock symbol + chart' to find the link to the chart of company",
+                    "Only output the final answer, no other text.",
+                     ],
+        add_datetime_to_instructions=True,
+        show_tool_calls=True,
+    )
 
 '''
 Finance Agent:
 - Handles financial data requests.
 - Uses YFinance and OpenBB for financial data.
-- Provides stock prices, analyst recommendations, target prices, technical indicators and company information.
+- Historical prices and technical indicators come from the local price store (price_store.py).
+- Provides stock prices, analyst recommendations, target prices, technical indicators, company information and portfolio analytics.
 instructions are designed to be clear and concise.
 instructions are designed based on the Agno GitHub repository and the Agno documentation to be the best fit.
 '''
-finance_agent = Agent(
-    name="Finance Agent",
-    role="Handle financial data requests",
-    model=Groq(id=finance_agent_model_id if finance_agent_model_id else agent_model_id, api_key=Groq_api_key),
-    tools=[
-        YFinanceTools(stock_price=True, 
-                      analyst_recommendations=True,
-                      company_info=False,
-                      technical_indicators=True,
-                      company_news = True,
-                      key_financial_ratios=False,
-                      historical_prices=True,
-                      cache_results=True,
-                      stock_fundamentals=True,                     
-                      ),
-        OpenBBTools(price_targets = True,
-                    search_symbols=True,
-                    cache_results=True
-                    ),
-    ],
-    description= "You are a stock market specialist. Provide concise and accurate data.",
-    instructions=[
-        "Use 'search_company_symbol()' function to find the correct company symbol",        
-        "Use the 'get_price_targets' function to get target prices.",
-        "Use tables to display stock prices, fundamentals (P/E, Market Cap), and recommendations.",
-        "Clearly state the company name and ticker symbol.",
-        "Use tools when appropriate. Only call a tool when you are certain of the arguments.",
-        "Only use `get_current_stock_price()` for stock prices; do not use price values from `company_info`.",
-        "Only output the final answer, no other text."
-    ],
-    add_datetime_to_instructions=True,
-    show_tool_calls=True,
-    debug_mode=True,
-)
+def get_finance_agent() -> Agent:
+    return Agent(
+        name="Finance Agent",
+        role="Handle financial data requests",
+        model=Groq(id=finance_agent_model_id if finance_agent_model_id else agent_model_id, api_key=Groq_api_key, client=groq_client),
+        tools=[
+            PrefetchedYFinanceTools(stock_price=True, 
+                          analyst_recommendations=True,
+                          company_info=False,
+                          technical_indicators=False, # served from the local price store, see PriceHistoryTools
+                          company_news = True,
+                          key_financial_ratios=False,
+                          historical_prices=False,
+                          cache_results=True,
+                          stock_fundamentals=True,                     
+                          ),
+            PrefetchedOpenBBTools(price_targets = True,
+                        search_symbols=True,
+                        cache_results=True
+                        ),
+            PriceHistoryTools(),
+            PortfolioTools(cache_results=True),
+        ],
+        description= "You are a stock market specialist. Provide concise and accurate data.",
+        instructions=[
+            "Use 'search_company_symbol()' function to find the correct company symbol",        
+            "Use the 'get_price_targets' function to get target prices.",
+            "Use the 'analyze_portfolio' function for portfolio questions (returns, weights, volatility, Sharpe, drawdown, VaR) with all holdings in one call.",
+            "Use tables to display stock prices, fundamentals (P/E, Market Cap), and recommendations.",
+            "Clearly state the company name and ticker symbol.",
+            "Use tools when appropriate. Only call a tool when you are certain of the arguments.",
+            "Only use `get_current_stock_price()` for stock prices; do not use price values from `company_info`.",
+            "Only output the final answer, no other text."
+        ],
+        add_datetime_to_instructions=True,
+        show_tool_calls=True,
+        debug_mode=True,
+    )
+
+_read_metrics = threading.local()
+_read_metrics_lock = threading.Lock()
+
+
+def count_storage_reads(metrics: Optional[Dict[str, Any]]) -> None:
+    """Count the storage reads of the current thread in metrics["storage_reads"], None stops counting."""
+    _read_metrics.metrics = metrics
+
+
+def storage_read_metrics() -> Optional[Dict[str, Any]]:
+    """The metrics the current thread counts its storage reads in, to hand them on to a worker thread."""
+    return getattr(_read_metrics, "metrics", None)
+
+
+class CountingSqliteStorage(SqliteStorage):
+    """SqliteStorage that counts every session read, including the reads agno does internally
+    (load_session, the read back after each upsert) and the ones of the search index backfill."""
+
+    def _count_read(self) -> None:
+        metrics = storage_read_metrics()
+        if metrics is not None:
+            with _read_metrics_lock:  # runs read from worker threads too
+                metrics["storage_reads"] = metrics.get("storage_reads", 0) + 1
+
+    def read(self, *args, **kwargs):
+        self._count_read()
+        return super().read(*args, **kwargs)
+
+    def get_all_sessions(self, *args, **kwargs):
+        self._count_read()
+        return super().get_all_sessions(*args, **kwargs)
+
+    def sessions_version(self) -> Tuple[int, Optional[int]]:
+        """Number of stored sessions and their latest updated_at. Changes whenever a session is
+        created, renamed, deleted or answered (in any browser tab). One aggregate query, no session is read."""
+        try:
+            with self.Session() as sess:
+                count, updated_at = sess.execute(
+                    select(func.count(), func.max(self.table.c.updated_at)).select_from(self.table)
+                ).one()
+            return count, updated_at
+        except Exception as e:  # e.g. the table doesn't exist before the first session is saved
+            logger.debug(f"Could not read the sessions version: {e}")
+            return 0, None
+
 
 db_table_name="agent_sessions"
 Storage_db_file="data.db"
 # Create a storage backend using the Sqlite database
-team_storage = SqliteStorage(
+team_storage = CountingSqliteStorage(
     # store sessions in the ai.sessions table
     table_name=db_table_name,
     # db_file: Sqlite database file
@@ -140,8 +204,19 @@ team_storage = SqliteStorage(
                 #this is critical for the team leader to function properly, since the default mode is "agent"
 )
 
+
+def get_member_agents() -> List[Agent]:
+    """Create fresh member agents for a team.
+    Every team gets its own members, so concurrent runs of different sessions never share
+    agent memory or run state. Only the Groq client and the tool cache are shared.
+    Returns:
+        List[Agent]: The web search, finance and calculator agents.
+    """
+    return [get_web_agent(), get_finance_agent(), get_calculator_agent()]
+
+
 #to ensure the model IDs are set correctly
-print (f"Web Agent Model ID: {web_agent.model.id}\nFinance Agent Model ID: {finance_agent.model.id}\nCalculator Agent Model ID: {calculator_agent.model.id}")
+print (f"Web Agent Model ID: {web_agent_model_id or agent_model_id}\nFinance Agent Model ID: {finance_agent_model_id or agent_model_id}\nCalculator Agent Model ID: {agent_model_id}")
 
 
 
@@ -174,11 +249,7 @@ def get_team_leader(
         session_id=session_id,  # Unique identifier for the session
         user_id="my_user_id",  # Unique identifier for the user
         session_name= session_name,  # Name of the session
-        members=[
-            web_agent,
-            finance_agent,
-            calculator_agent,
-        ],
+        members=get_member_agents(),
         tools=[ReasoningTools(add_instructions=True)],
         instructions=[
             "Only output the final answer, no other text.",
@@ -187,6 +258,7 @@ def get_team_leader(
             "Use Finance Agent for ALL Target Prices.",
             "Use Web Search Agent to find links to charts.",
             "Use Calculator Agent for calculations if needed.",
+            "Send portfolio questions with all holdings to Finance Agent at once instead of computing them step by step.",
         ],
         markdown=True,
         show_members_responses=True,
@@ -6,21 +6,24 @@ manages chat sessions, and provides utilities for user interaction.
 '''
 import nest_asyncio
 import streamlit as st
-import traceback
+import time
+from uuid import uuid4
 
-from Team_leader import get_team_leader  # ← team leader agent import
 from agno.team.team import Team
 from agno.utils.log import logger
 from utils import (
     CUSTOM_CSS,
     about_widget,
     add_message,
+    display_chat_history,
     display_tool_calls,
     export_chat_history,
-    rename_session_widget,
-    get_selected,
-    load_chat_session,
 )
+import session_controller
+import session_search
+from run_manager import RunQueueFull, run_manager
+import session_memory
+from prefetch import prefetch_for_prompt
 
 nest_asyncio.apply()
 st.set_page_config(
@@ -33,16 +36,9 @@ st.set_page_config(
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 
-def restart_agent():
-    logger.info("---*--- Restarting agent ---*---")
-    st.session_state["team_agent"] = None
-    st.session_state["team_agent_session_id"] = None
-    st.session_state["messages"] = []
-    st.rerun()
-
-
 def main():
     logger.info("main started")
+    session_controller.count_script_run()
     ####################################################################
     # Header
     ####################################################################
@@ -66,114 +62,33 @@ def main():
         options=list(model_options.keys()),
         index=0,
         key="model_selector",
+        on_change=session_controller.user_input,
+        args=("model",),
     )
     model_id = model_options[selected_model]
-    ####################################################################
-    # Initialize Flags
-    ####################################################################
-    if ("can_select_flag" not in st.session_state):
-        st.session_state["can_select_flag"] = True
-        #print(f"can_select_flag created: {st.session_state['can_select_flag']}")
-
-    if ("is_renamed_flag" not in st.session_state):
-        st.session_state["is_renamed_flag"] = False
-        #print(f"is_renamed_flag created: {st.session_state['is_renamed_flag']}")
-
-    if "create_new_chat" not in st.session_state:
-        st.session_state["create_new_chat"] = False
-        #print(f"create_new_chat created: {st.session_state['create_new_chat']}")
-
     ####################################################################
     # Initialize Agent
     ####################################################################
-    agent: Team
-    if (
-        "team_agent" not in st.session_state
-        or st.session_state["team_agent"] is None
-        or st.session_state.get("current_model") != model_id
-    ):
-        logger.info("---*--- Creating new Team Agent ---*---")
-        agent = get_team_leader(model_id=model_id)
-        st.session_state["team_agent"] = agent
-        st.session_state["current_model"] = model_id
-        logger.info("new agent created")
+    agent: Team = session_controller.ensure_team(model_id)
 
-        #new 
-        if st.session_state["create_new_chat"] :
-            agent.load_session()
-            st.session_state["create_new_chat"] = False
-        #new
-        st.session_state["team_agent_session_id"] =  agent.session_id #agent.load_session() 
-        #print(f"Session created: {st.session_state['team_agent_session_id']}")
-        
-        #new
-        st.session_state["can_select_flag"] = False
-        #print("can_select_flag set to False")
-        
-        
-    else:
-        agent = st.session_state["team_agent"]
-        logger.info("agent loaded from session state")
-        st.session_state["can_select_flag"] = True
-        #print(f"can_select_flag set to {st.session_state["can_select_flag"]}")
-        
-        #I should load chat history from agent storage
-      #  print(f"before upper session selector with model_id: {model_id}")
-      #  session_selector_widget(team=agent ,model_id=st.session_state["current_model"])
-       # print("after upper session selector")
-        
-    
     ####################################################################
-    # Load session from memory
+    # Memory accounting
     ####################################################################
-    session_id_exists = (
-        "team_agent_session_id" in st.session_state
-        and st.session_state["team_agent_session_id"]
-    )
-
-    if not session_id_exists:
-        #print("Not exist Session ID")
-        try:
-            st.session_state["team_agent_session_id"] =  agent.session_id #agent.load_session() #
-            #print(f"Session created: {st.session_state['team_agent_session_id']}")
-
-        except Exception as e:
-            logger.error(f"Session load error: {str(e)}\n{traceback.format_exc()}")
-            st.warning("Could not create session, check backend.")
-    elif (
-        st.session_state["team_agent_session_id"]
-        and hasattr(agent, "memory")
-        and agent.memory is not None
-        and not agent.memory.runs
-    ):
-        #print("inside elif")
-        try:
-            agent.load_session(st.session_state["team_agent_session_id"])
-            #print(f"Session loaded: {st.session_state['team_agent_session_id']}")
-        except Exception as e:
-            logger.error(f"Failed to load session: {str(e)}\n{traceback.format_exc()}")
-    
+    browser_session_key = st.session_state.setdefault("browser_session_key", str(uuid4()))
+    busy_session_ids = run_manager.active_session_ids()
+    if session_memory.track_session(browser_session_key, agent, st.session_state.get("messages", []), busy_session_ids):
+        logger.info("team memory was released while idle, reloading from storage")
+        session_controller.reload_session(agent)
+        session_memory.track_session(browser_session_key, agent, st.session_state["messages"], busy_session_ids)
+    session_memory.evict_idle_sessions(busy_session_ids=busy_session_ids)
 
-    agent_runs = []
-    if hasattr(agent, "memory") and agent.memory is not None:
-        agent_runs = agent.memory.runs
-
-    if "messages" not in st.session_state:
-        st.session_state["messages"] = []
-
-    if len(st.session_state["messages"]) == 0 and len(agent_runs) > 0:
-        #print("inside memory run manager")
-        for _run in agent_runs:
-            if hasattr(_run, "message") and _run.message is not None:
-                add_message(_run.message.role, _run.message.content)
-            if hasattr(_run, "response") and _run.response is not None:
-                add_message("assistant", _run.response.content, _run.response.tools)
-
-    elif len(agent_runs) == 0 and len(st.session_state["messages"]) == 0:
-        logger.debug("No previous runs found")
-
-    if prompt := st.chat_input("🧠 Ask me here"):
-        add_message("user", prompt)
+    if prompt := st.chat_input("🧠 Ask me here", on_submit=session_controller.user_input, args=("question",)):
+        if st.session_state.get("active_run_id"):
+            # still answering: queue the question, it is added after the current answer
+            st.session_state.setdefault("pending_prompts", []).append(prompt)
+        else:
+            add_message("user", prompt)
+        prefetch_for_prompt(prompt)  # warm up finance data while the team leader is still planning
 
     ####################################################################
     # Utilities
@@ -181,9 +96,7 @@ def main():
     st.sidebar.markdown("#### 🛠️ Utilities")
     col1, col2 = st.sidebar.columns([1, 1])
     with col1:
-        if st.sidebar.button("🔄 New Chat", use_container_width=True):
-            st.session_state["create_new_chat"] = True
-            restart_agent()
+        session_controller.new_chat_button()
     with col2:
         if st.sidebar.download_button(
             "💾 Export Chat",
@@ -191,6 +104,8 @@ def main():
             file_name="team_agent_chat.md",
             mime="text/markdown",
             use_container_width=True,
+            on_click=session_controller.user_input,
+            args=("export",),
         ):
             st.sidebar.success("Chat history exported!")
 
@@ -198,98 +113,95 @@ def main():
     # Delete chat session button
     ####################################################################    
         # 🔸 Delete Button & Confirmation Logic
-    if st.sidebar.button("🗑️ Delete Current Chat", use_container_width=True):
-        st.session_state["want_delete"] = True
-
-    if st.session_state.get("want_delete"):
-        st.sidebar.warning("Are you sure you want to delete this chat?")
-        col3, col4 = st.sidebar.columns(2)
-        with col3:
-            if st.button("✅ Yes", key="confirm_delete_yes"):
-                agent.delete_session(st.session_state["team_agent_session_id"])                
-                st.session_state["want_delete"] = False
-                restart_agent()  # Restart agent to clear state
-        with col4:
-            if st.button("❌ Cancel", key="confirm_delete_no"):
-                st.session_state["want_delete"] = False
-                st.rerun()  # Rerun to reset state
+    session_controller.delete_session_widget()
 
     ####################################################################
     # Display chat
     ####################################################################
     
-    for message in st.session_state["messages"]:
-        if message["role"] in ["user", "assistant"]:
-            _content = message["content"]
-            if _content:
-                with st.chat_message(message["role"]):
-                    if "tool_calls" in message and message["tool_calls"]:
-                        display_tool_calls(st.empty(), message["tool_calls"])
-                    st.markdown(_content)
-    
+    display_chat_history()
+
     ####################################################################
     # Respond to user
     ####################################################################
-    last_message = (
-        st.session_state["messages"][-1] if st.session_state["messages"] else None
-    )
-    if last_message and last_message.get("role") == "user":
-        question = last_message["content"]
-        with st.chat_message("assistant"):
+    while True:
+        active_run = run_manager.get(st.session_state.get("active_run_id"))
+        if active_run is not None and active_run.session_id != st.session_state["team_agent_session_id"]:
+            # switched chats while answering, the run finishes in the background and is saved to its own session
+            st.session_state["active_run_id"] = None
+            st.session_state["pending_prompts"] = []
+            active_run = None
+
+        if active_run is None:
+            last_message = st.session_state["messages"][-1] if st.session_state["messages"] else None
+            pending_prompts = st.session_state.get("pending_prompts")
+            if pending_prompts and not (last_message and last_message.get("role") == "user"):
+                add_message("user", pending_prompts.pop(0))
+                last_message = st.session_state["messages"][-1]
+                with st.chat_message("user"):
+                    st.markdown(last_message["content"])
+            if not (last_message and last_message.get("role") == "user"):
+                break
+            try:
+                active_run = run_manager.submit(agent, last_message["content"], on_done=session_search.index_team_session)
+                st.session_state["active_run_id"] = active_run.run_id
+            except RunQueueFull as e:
+                error_message = f"Sorry, {str(e)}."
+                add_message("assistant", error_message)
+                st.error(error_message)
+                break
+
+        # (re)attach to the run: show what was buffered so far and follow it until it's done.
+        # a rerun interrupts only this loop, the run itself keeps going in the worker pool.
+        answer_container = st.chat_message("assistant")
+        pending_view = st.empty()
+        if st.session_state.get("pending_prompts"):
+            with pending_view.container():
+                for pending_prompt in st.session_state["pending_prompts"]:
+                    st.caption(f"⏳ Queued: {pending_prompt}")
+        with answer_container:
             tool_calls_container = st.empty()
             resp_container = st.empty()
+            elapsed_container = st.empty()
             with st.spinner("🤔 Thinking..."):
-                response = ""
-                try:
-                    run_response = agent.run(question, stream=True)
-                    for _resp_chunk in run_response:
-                        if _resp_chunk.tools and len(_resp_chunk.tools) > 0:
-                            display_tool_calls(tool_calls_container, _resp_chunk.tools)
-                        if _resp_chunk.content:
-                            response += _resp_chunk.content
-                            resp_container.markdown(response)
-                    add_message("assistant", response, agent.run_response.tools)
-                except Exception as e:
-                    error_message = f"Sorry, I encountered an error: {str(e)}"
-                    add_message("assistant", error_message)                    
-                    logger.error(f"Error during agent run: {str(e)}\n{traceback.format_exc()}")
-                    st.error(error_message)
-        #print("Response sent to chat")
-        st.session_state["can_select_flag"] = False
-        #print(f"can_select_flag set to {st.session_state['can_select_flag']}")
+                version, shown_tools, shown_content = -1, None, ""
+                while True:
+                    version = active_run.wait_for_update(version)
+                    # touch the page on every tick, a pending rerun (click) is only handled at a Streamlit call
+                    elapsed_container.caption(f"⏱️ {time.time() - active_run.submitted_at:.0f}s")
+                    if active_run.tools and active_run.tools is not shown_tools:
+                        shown_tools = active_run.tools
+                        display_tool_calls(tool_calls_container, shown_tools)
+                    if active_run.content != shown_content:
+                        shown_content = active_run.content
+                        resp_container.markdown(shown_content)
+                    if active_run.done:
+                        break
+            elapsed_container.empty()
+            if active_run.status == "error":
+                error_message = f"Sorry, I encountered an error: {active_run.error}"
+                add_message("assistant", error_message)
+                st.error(error_message)
+            else:
+                add_message("assistant", active_run.content, active_run.tools)
+        st.session_state["active_run_id"] = None
+        session_controller.mark_sessions_seen(agent)  # the run saved the session, the list is still up to date
+        pending_view.empty()
+        # questions asked meanwhile are answered next, each right after its own question
 
     ####################################################################
     # Session handling
     ####################################################################
-    #print("before session selector")
-    #print(f"agent Sid: {agent.session_id}")
-    #session_selector_widget(agent, model_id)
-    #print(f"is_renamed_flag : {st.session_state['is_renamed_flag']}, can_select_flag: {st.session_state['can_select_flag']}")
-    if st.session_state["can_select_flag"] and (st.session_state["is_renamed_flag"] is False): #can select session and not renamed
-        selected_S_id = get_selected(agent, default_selected_S_id=st.session_state["team_agent_session_id"])
-        if selected_S_id:
-            #print(f"Selected session ID: {selected_S_id}")
-            if selected_S_id != st.session_state["team_agent_session_id"]:
-                st.session_state["team_agent_session_id"] = selected_S_id
-                load_chat_session(agent, model_id, selected_S_id)
-                st.rerun()
-            else:
-                #st.session_state["team_agent_session_id"] = selected_S_id
-                load_chat_session(agent, model_id, selected_S_id,same_session_id=True) #load selected session_id and write to screen 
-        else: #no saved session in agent
-            #print("No session saved chat.")
-            load_chat_session(agent,  model_id, st.session_state["team_agent_session_id"],) #load selected session_id and write to screen      
-    else: #can not select session or is renamed
-        selected_S_id = get_selected(team= agent, default_selected_S_id=st.session_state["team_agent_session_id"])         
-        #print(f"can not select. loading session: {st.session_state['team_agent_session_id']}")
-        st.session_state["is_renamed_flag"] = False
-        if st.session_state["is_renamed_flag"] is True: #session name is renamed
-            load_chat_session(agent, model_id, st.session_state["team_agent_session_id"])
-        else: #same session name
-            load_chat_session(agent, model_id, st.session_state["team_agent_session_id"],same_session_id=True) #load selected session_id and write to screen 
-        
-    #print("after session selector")
-    rename_session_widget(agent)
+    session_controller.session_selector_widget(agent)
+    session_controller.rename_session_widget(agent)
+    session_controller.session_search_widget(agent)
+    session_controller.session_metrics_widget()
+
+    memory = session_memory.memory_report(browser_session_key)
+    st.sidebar.caption(
+        f"🧮 Memory: {memory['session_bytes'] / 1024:.0f} KB this chat, "
+        f"{memory['total_bytes'] / 1024:.0f} KB across {memory['sessions']} session(s)"
+    )
 
     ####################################################################
     # About section
@@ -0,0 +1,184 @@
+'''
+Portfolio analytics tool for the Finance Agent.
+Builds one price matrix (days x holdings) from the local price store, aligned on the trading days
+all holdings have in common, and computes returns, weights, covariance, volatility, Sharpe ratio,
+drawdown and historical VaR with NumPy in one call, instead of the team leader chaining many
+calculator steps over prices fetched one ticker at a time.
+'''
+import json
+from functools import reduce
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import logger
+
+from price_store import PriceStore, price_store
+
+trading_days_per_year = 252
+
+
+def portfolio_metrics(
+    prices: np.ndarray,
+    holdings: np.ndarray,
+    risk_free_rate: float = 0.0,
+    var_confidence: float = 0.95,
+) -> Dict[str, Any]:
+    """Compute buy-and-hold portfolio statistics from a price matrix.
+    Args:
+        prices (np.ndarray): Close prices, shape (days, holdings), oldest first.
+        holdings (np.ndarray): Number of shares per holding, shape (holdings,).
+        risk_free_rate (float): Annual risk free rate used for the Sharpe ratio.
+        var_confidence (float): Confidence level of the 1-day historical VaR.
+    Returns:
+        Dict[str, Any]: Portfolio and per holding statistics, returns and volatilities annualized.
+    """
+    values = prices @ holdings  # portfolio value per day
+    asset_returns = prices[1:] / prices[:-1] - 1.0
+    portfolio_returns = values[1:] / values[:-1] - 1.0
+    periods = len(portfolio_returns)
+    years = periods / trading_days_per_year
+
+    total_return = values[-1] / values[0] - 1.0
+    annual_return = (1.0 + total_return) ** (1.0 / years) - 1.0
+    volatility = portfolio_returns.std(ddof=1) * np.sqrt(trading_days_per_year)
+    excess_return = portfolio_returns.mean() * trading_days_per_year - risk_free_rate
+    sharpe = excess_return / volatility if volatility > 0 else float("nan")
+
+    drawdowns = values / np.maximum.accumulate(values) - 1.0
+    var_return = -np.percentile(portfolio_returns, (1.0 - var_confidence) * 100.0)
+
+    covariance = np.atleast_2d(np.cov(asset_returns, rowvar=False)) * trading_days_per_year
+    asset_volatility = np.sqrt(np.diag(covariance))
+    correlation = covariance / np.outer(asset_volatility, asset_volatility)
+    weights = holdings * prices[-1] / values[-1]
+
+    return {
+        "start_value": values[0],
+        "end_value": values[-1],
+        "total_return": total_return,
+        "annualized_return": annual_return,
+        "annualized_volatility": volatility,
+        "sharpe_ratio": sharpe,
+        "max_drawdown": drawdowns.min(),
+        "current_drawdown": drawdowns[-1],
+        "var_confidence": var_confidence,
+        "daily_var_return": var_return,
+        "daily_var_value": var_return * values[-1],
+        "weights": weights,
+        "asset_total_returns": prices[-1] / prices[0] - 1.0,
+        "asset_volatility": asset_volatility,
+        "covariance": covariance,
+        "correlation": correlation,
+        "observations": periods,
+    }
+
+
+def _rounded(value: Any, digits: int = 4) -> Any:
+    if isinstance(value, np.ndarray):
+        return np.round(value, digits).tolist()
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else round(float(value), digits)
+    return value
+
+
+class PortfolioTools(Toolkit):
+    def __init__(
+        self,
+        risk_free_rate: float = 0.0,
+        var_confidence: float = 0.95,
+        store: Optional[PriceStore] = None,
+        **kwargs,
+    ):
+        super().__init__(name="portfolio_tools", **kwargs)
+        self.store = store or price_store
+        self.risk_free_rate = risk_free_rate
+        self.var_confidence = var_confidence
+        self.register(self.analyze_portfolio)
+
+    def _price_matrix(self, symbols: List[str], period: str) -> np.ndarray:
+        # daily bars of every holding from the price store, aligned on the trading days they all have.
+        # refresh them together first, so a cold store downloads all holdings concurrently
+        self.store.update_many(symbols, "1d")
+        bars = {symbol: self.store.get_bars(symbol, period, "1d") for symbol in symbols}
+        missing = [symbol for symbol in symbols if not len(bars[symbol]["timestamp"])]
+        if missing:
+            raise ValueError(f"no price data for {', '.join(missing)}")
+        common = reduce(np.intersect1d, (bars[symbol]["timestamp"] for symbol in symbols))
+        prices = np.empty((len(common), len(symbols)))
+        for i, symbol in enumerate(symbols):
+            rows = np.searchsorted(bars[symbol]["timestamp"], common)  # stored timestamps are sorted
+            prices[:, i] = bars[symbol]["close"][rows]
+        return prices[~np.isnan(prices).any(axis=1)]
+
+    def analyze_portfolio(self, symbols: List[str], shares: Optional[List[float]] = None, period: str = "1y") -> str:
+        """Use this function to analyze a stock portfolio in one call: total and annualized return, weights,
+        volatility, Sharpe ratio, max drawdown, 1-day historical Value at Risk, and the covariance and
+        correlation of the holdings.
+
+        Args:
+            symbols (List[str]): The stock symbols of the holdings, e.g. ["AAPL", "MSFT", "NVDA"].
+            shares (List[float]): Optional number of shares per symbol, in the same order as symbols.
+                If omitted, the portfolio starts with equal amounts invested in every symbol.
+            period (str): The history window. Valid periods: 1mo,3mo,6mo,1y,2y,5y,10y,ytd,max. Defaults to 1y.
+
+        Returns:
+            str: JSON with the portfolio statistics and the per holding statistics.
+        """
+        if isinstance(symbols, str):
+            symbols = symbols.replace(",", " ").split()
+        symbols = [symbol.strip().upper() for symbol in symbols if symbol.strip()]
+        if not symbols:
+            return "Error analyzing portfolio: no symbols given"
+        if shares is not None and len(shares) != len(symbols):
+            return "Error analyzing portfolio: shares must have one entry per symbol"
+
+        try:
+            prices = self._price_matrix(symbols, period)
+            if len(prices) < 3:
+                return f"Error analyzing portfolio: not enough common price history for {', '.join(symbols)}"
+            if shares is not None:
+                holdings = np.asarray(shares, dtype=float)
+            else:
+                holdings = (1.0 / len(symbols)) / prices[0]  # equal value in every symbol at the start
+            metrics = portfolio_metrics(prices, holdings, self.risk_free_rate, self.var_confidence)
+        except Exception as e:
+            logger.warning(f"Error analyzing portfolio {symbols}: {e}")
+            return f"Error analyzing portfolio: {e}"
+
+        holdings_stats = {
+            symbol: {
+                "shares": _rounded(holdings[i]) if shares is not None else None,
+                "last_price": _rounded(prices[-1, i], 2),
+                "weight": _rounded(metrics["weights"][i]),
+                "total_return": _rounded(metrics["asset_total_returns"][i]),
+                "annualized_volatility": _rounded(metrics["asset_volatility"][i]),
+            }
+            for i, symbol in enumerate(symbols)
+        }
+        result = {
+            "symbols": symbols,
+            "period": period,
+            "portfolio": {
+                key: _rounded(metrics[key])
+                for key in (
+                    "total_return",
+                    "annualized_return",
+                    "annualized_volatility",
+                    "sharpe_ratio",
+                    "max_drawdown",
+                    "current_drawdown",
+                    "var_confidence",
+                    "daily_var_return",
+                    "observations",
+                )
+            },
+            "holdings": holdings_stats,
+            "covariance": _rounded(metrics["covariance"], 6),
+            "correlation": _rounded(metrics["correlation"]),
+        }
+        if shares is not None:
+            result["portfolio"]["start_value"] = _rounded(metrics["start_value"], 2)
+            result["portfolio"]["end_value"] = _rounded(metrics["end_value"], 2)
+            result["portfolio"]["daily_var_value"] = _rounded(metrics["daily_var_value"], 2)
+        return json.dumps(result, indent=2)
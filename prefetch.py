@@ -0,0 +1,219 @@
+'''
+Speculative prefetch of finance data from the user prompt.
+Most prompts literally name the tickers or companies. As soon as a prompt is submitted the symbols
+are extracted and quotes, fundamentals, analyst recommendations and price targets are fetched
+concurrently, while the team leader is still planning. The Finance Agent uses the Prefetched*
+toolkits below, which serve a fresh prefetched result (or wait for the in-flight request)
+instead of starting a second network call.
+'''
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from agno.tools.openbb import OpenBBTools
+from agno.tools.yfinance import YFinanceTools
+from agno.utils.log import logger
+
+from price_store import price_store_dir
+
+max_prefetch_symbols = 5
+prefetch_ttl = 120  # seconds a prefetched result is served
+prefetch_wait_timeout = 15  # seconds a tool call waits for an in-flight prefetch
+
+# common company names as they are written, so "how is Nvidia doing" prefetches NVDA as well.
+# matched case-sensitively (or all caps), so "meta learning" doesn't prefetch META
+company_symbols = {
+    "Apple": "AAPL",
+    "Microsoft": "MSFT",
+    "Nvidia": "NVDA",
+    "Tesla": "TSLA",
+    "Amazon": "AMZN",
+    "Google": "GOOGL",
+    "Alphabet": "GOOGL",
+    "Meta": "META",
+    "Facebook": "META",
+    "Netflix": "NFLX",
+    "Intel": "INTC",
+    "Broadcom": "AVGO",
+    "Oracle": "ORCL",
+    "Salesforce": "CRM",
+    "Adobe": "ADBE",
+    "Palantir": "PLTR",
+    "Berkshire": "BRK-B",
+    "JPMorgan": "JPM",
+    "Visa": "V",
+    "Mastercard": "MA",
+    "Walmart": "WMT",
+    "Coca-Cola": "KO",
+    "Pepsi": "PEP",
+    "Disney": "DIS",
+    "Boeing": "BA",
+    "Exxon": "XOM",
+    "Pfizer": "PFE",
+    "Qualcomm": "QCOM",
+    "Uber": "UBER",
+}
+
+# widely traded tickers usually written without a company name
+popular_symbols = {
+    "AMD", "IBM", "CSCO", "TSM", "ASML", "SMCI", "PYPL", "COIN", "CRWD", "PANW", "ABNB", "LLY", "UNH", "JNJ",
+    "MRK", "ABBV", "NVO", "BAC", "WFC", "MCD", "NKE", "SBUX", "CVX", "RIVN", "VZ", "SPY", "QQQ", "DIA", "IWM", "VOO",
+}
+
+# tickers that are also common words or abbreviations ("C++", "HD screen", "BUY AMD"), only prefetched
+# as $cashtags. Company names still map to them, e.g. "Visa" -> V
+_not_symbols = {
+    "A", "ALL", "ARE", "BE", "BUY", "CAN", "GO", "IT", "NOW", "ON", "ONE", "OR", "SO", "SEE", "WELL",
+    "ARM", "BA", "C", "COST", "F", "GM", "GS", "HD", "HOOD", "MA", "MS", "MU", "NET", "SHOP", "SNOW", "SQ", "T", "V",
+}
+_cashtag_pattern = re.compile(r"\$([A-Za-z]{1,5}(?:[.-][A-Za-z])?)\b")
+_word_pattern = re.compile(r"(?<![$&\w])([A-Z]{1,5}(?:[.-][A-Z])?)(?![&\w])")
+_name_patterns = {
+    name: re.compile(rf"\b(?:{re.escape(name)}|{re.escape(name.upper())})\b") for name in company_symbols
+}
+
+
+def known_symbols() -> Set[str]:
+    """Symbols an all-caps word is taken for: the ones above plus every symbol in the local price store."""
+    symbols = set(company_symbols.values()) | popular_symbols
+    stored = os.path.join(price_store_dir, "1d")
+    if os.path.isdir(stored):
+        symbols.update(os.listdir(stored))
+    return symbols
+
+
+def _normalize(symbol: str) -> str:
+    return symbol.upper().replace(".", "-")  # BRK.B -> BRK-B as yfinance expects
+
+
+def extract_symbols(prompt: str) -> List[str]:
+    """Find ticker symbols in a prompt.
+    Every $-prefixed ticker is taken. Then company names and all-caps words that are known symbols
+    fill up to `max_prefetch_symbols` in prompt order, so ordinary words in a shouted question are ignored.
+    """
+    symbols: List[str] = []
+    for cashtag in _cashtag_pattern.findall(prompt):
+        if _normalize(cashtag) not in symbols:
+            symbols.append(_normalize(cashtag))
+
+    # company names and known all-caps symbols, in the order they appear in the prompt
+    known = known_symbols()
+    found = [(match.start(), company_symbols[name])
+             for name, pattern in _name_patterns.items() for match in pattern.finditer(prompt)]
+    found += [(match.start(), _normalize(match.group(1))) for match in _word_pattern.finditer(prompt)
+              if _normalize(match.group(1)) in known and _normalize(match.group(1)) not in _not_symbols]
+    candidates = [symbol for _, symbol in sorted(found)]
+    limit = max(max_prefetch_symbols, len(symbols))  # cashtags are never dropped
+    for symbol in candidates:
+        if len(symbols) >= limit:
+            break
+        if symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+_entries: Dict[Tuple[str, str], Tuple[float, Future]] = {}
+_fetchers: Optional[Dict[str, Callable[[str], str]]] = None
+
+
+def _get_fetchers() -> Dict[str, Callable[[str], str]]:
+    # plain toolkits, so prefetching never goes through the prefetch lookup itself
+    global _fetchers
+    if _fetchers is None:
+        yfinance_tools = YFinanceTools(stock_price=True, stock_fundamentals=True, analyst_recommendations=True)
+        openbb_tools = OpenBBTools(price_targets=True)
+        _fetchers = {
+            "get_current_stock_price": yfinance_tools.get_current_stock_price,
+            "get_stock_fundamentals": yfinance_tools.get_stock_fundamentals,
+            "get_analyst_recommendations": yfinance_tools.get_analyst_recommendations,
+            "get_price_targets": openbb_tools.get_price_targets,
+        }
+    return _fetchers
+
+
+def prefetch_for_prompt(prompt: str) -> List[str]:
+    """Start fetching finance data for every symbol named in the prompt. Returns immediately.
+    Returns:
+        List[str]: The symbols being prefetched.
+    """
+    symbols = extract_symbols(prompt)
+    if not symbols:
+        return []
+    now = time.time()
+    with _lock:
+        for key, (created_at, _) in list(_entries.items()):
+            if now - created_at > prefetch_ttl:
+                del _entries[key]
+        for symbol in symbols:
+            for name, fetch in _get_fetchers().items():
+                if (name, symbol) not in _entries:
+                    _entries[(name, symbol)] = (now, _executor.submit(fetch, symbol))
+    logger.info(f"---*--- Prefetching {', '.join(symbols)} ---*---")
+    return symbols
+
+
+# the toolkits report failures as strings, e.g. "Error fetching current price for X: ..."
+_error_prefixes = ("error", "could not", "no data", "no price", "failed")
+
+
+def _is_error(result: Optional[str]) -> bool:
+    return not isinstance(result, str) or not result.strip() or result.strip().lower().startswith(_error_prefixes)
+
+
+def _drop(key: Tuple[str, str], entry: Tuple[float, Future]) -> None:
+    with _lock:
+        if _entries.get(key) is entry:  # a newer prefetch may have replaced it meanwhile
+            del _entries[key]
+
+
+def get_prefetched(name: str, symbol: str) -> Optional[str]:
+    """Return the prefetched result of a tool call, waiting for it if it is still in flight.
+    Returns None when nothing fresh was prefetched or the prefetch failed, so the caller fetches
+    by itself. Failed results are dropped instead of being served for the whole `prefetch_ttl`."""
+    key = (name, symbol.upper())
+    with _lock:
+        entry = _entries.get(key)
+    if entry is None or time.time() - entry[0] > prefetch_ttl:
+        return None
+    try:
+        result = entry[1].result(timeout=prefetch_wait_timeout)
+    except FutureTimeoutError:
+        return None
+    except Exception as e:
+        logger.warning(f"Prefetch of {name}({symbol}) failed: {e}")
+        _drop(key, entry)
+        return None
+    if _is_error(result):
+        logger.warning(f"Prefetch of {name}({symbol}) returned an error, fetching again: {result}")
+        _drop(key, entry)
+        return None
+    return result
+
+
+class PrefetchedYFinanceTools(YFinanceTools):
+    def get_current_stock_price(self, symbol: str) -> str:
+        return get_prefetched("get_current_stock_price", symbol) or super().get_current_stock_price(symbol)
+
+    def get_stock_fundamentals(self, symbol: str) -> str:
+        return get_prefetched("get_stock_fundamentals", symbol) or super().get_stock_fundamentals(symbol)
+
+    def get_analyst_recommendations(self, symbol: str) -> str:
+        return get_prefetched("get_analyst_recommendations", symbol) or super().get_analyst_recommendations(symbol)
+
+    # the model sees the docstrings as tool descriptions, keep the original ones
+    get_current_stock_price.__doc__ = YFinanceTools.get_current_stock_price.__doc__
+    get_stock_fundamentals.__doc__ = YFinanceTools.get_stock_fundamentals.__doc__
+    get_analyst_recommendations.__doc__ = YFinanceTools.get_analyst_recommendations.__doc__
+
+
+class PrefetchedOpenBBTools(OpenBBTools):
+    def get_price_targets(self, symbol: str) -> str:
+        return get_prefetched("get_price_targets", symbol) or super().get_price_targets(symbol)
+
+    get_price_targets.__doc__ = OpenBBTools.get_price_targets.__doc__
@@ -0,0 +1,329 @@
+'''
+Local price history store.
+Keeps daily (and optionally intraday) bars per ticker in columnar binary files, one file per column:
+    price_store/<interval>/<SYMBOL>/{timestamp,open,high,low,close,volume}.bin
+Files are only ever appended to (the last, possibly still forming bar may be rewritten in place),
+so an update only downloads the bars after the last stored one. Prices are split/dividend adjusted:
+each update downloads the last complete stored bar again, and if its adjusted close changed the whole
+series is downloaded again and replaced at once, so old and new bars never mix adjustment factors.
+Reads are memory-mapped and tools work on zero-copy slices of the mapped columns instead of network calls.
+'''
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import yfinance as yf
+from agno.tools import Toolkit
+from agno.utils.log import logger
+
+price_store_dir = "price_store"
+
+columns = {
+    "timestamp": np.int64,  # bar start, seconds since epoch (UTC)
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+}
+_yfinance_columns = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# how far back the first download goes and how long stored bars are considered up to date
+max_history = {"1d": "10y", "1h": "730d", "30m": "60d", "15m": "60d", "5m": "60d", "1m": "7d"}
+refresh_after = {"1d": 15 * 60, "1h": 5 * 60, "30m": 2 * 60, "15m": 60, "5m": 60, "1m": 30}
+
+_period_days = {"d": 1, "wk": 7, "mo": 30, "y": 365}
+
+_update_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="price-store")
+
+
+def period_start(period: str, now: Optional[datetime] = None) -> int:
+    """Epoch seconds of the start of a yfinance style period (5d, 1mo, 6mo, 1y, ytd, max)."""
+    now = now or datetime.now(timezone.utc)
+    if period == "max":
+        return 0
+    if period == "ytd":
+        return int(datetime(now.year, 1, 1, tzinfo=timezone.utc).timestamp())
+    for unit, days in _period_days.items():
+        if period.endswith(unit) and period[: -len(unit)].isdigit():
+            return int((now - timedelta(days=int(period[: -len(unit)]) * days)).timestamp())
+    raise ValueError(f"invalid period '{period}', use e.g. 5d, 1mo, 3mo, 6mo, 1y, 5y, ytd or max")
+
+
+class PriceStore:
+    def __init__(self, root: str = price_store_dir):
+        self.root = root
+        self._locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, symbol: str, interval: str) -> threading.RLock:
+        with self._locks_lock:
+            return self._locks.setdefault((symbol, interval), threading.RLock())
+
+    def _path(self, symbol: str, interval: str, column: str) -> str:
+        return os.path.join(self.root, interval, symbol, f"{column}.bin")
+
+    def load(self, symbol: str, interval: str = "1d") -> Dict[str, np.ndarray]:
+        """Memory-map all stored bars of a symbol. Columns are read-only and of equal length."""
+        symbol = symbol.upper()
+        lengths = []
+        for column, dtype in columns.items():
+            path = self._path(symbol, interval, column)
+            lengths.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        length = min(lengths)  # an interrupted append may have left some columns longer
+        if length == 0:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in columns.items()}
+        return {
+            column: np.memmap(self._path(symbol, interval, column), dtype=dtype, mode="r", shape=(length,))
+            for column, dtype in columns.items()
+        }
+
+    def _fetch(self, symbol: str, interval: str, start: Optional[int]) -> Dict[str, np.ndarray]:
+        ticker = yf.Ticker(symbol)
+        if start is None:
+            hist = ticker.history(period=max_history.get(interval, "1y"), interval=interval, auto_adjust=True)
+        else:
+            hist = ticker.history(
+                start=datetime.fromtimestamp(start, tz=timezone.utc), interval=interval, auto_adjust=True
+            )
+        if hist is None or hist.empty:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in columns.items()}
+        bars = {"timestamp": (hist.index.asi8 // 1_000_000_000).astype(np.int64)}
+        for column, source in _yfinance_columns.items():
+            bars[column] = hist[source].to_numpy(dtype=np.float64)
+        return bars
+
+    def _write(self, symbol: str, interval: str, stored: Dict[str, np.ndarray], bars: Dict[str, np.ndarray]) -> int:
+        os.makedirs(os.path.dirname(self._path(symbol, interval, "timestamp")), exist_ok=True)
+        # drop rows an interrupted append left in some columns only, so every column ends at the same bar
+        length = len(stored["timestamp"])
+        for column, dtype in columns.items():
+            path = self._path(symbol, interval, column)
+            if os.path.exists(path) and os.path.getsize(path) > length * np.dtype(dtype).itemsize:
+                os.truncate(path, length * np.dtype(dtype).itemsize)
+        last_ts = stored["timestamp"][-1] if length else None
+        if last_ts is not None:
+            same = bars["timestamp"] == last_ts
+            if same.any():  # the last stored bar was still forming, rewrite it in place
+                row = np.flatnonzero(same)[-1]
+                for column, dtype in columns.items():
+                    mapped = np.memmap(self._path(symbol, interval, column), dtype=dtype, mode="r+")
+                    mapped[length - 1] = bars[column][row]
+                    mapped.flush()
+                    del mapped
+            new = bars["timestamp"] > last_ts
+            bars = {column: values[new] for column, values in bars.items()}
+        # timestamps last: a bar only counts once every column has it
+        for column in list(_yfinance_columns) + ["timestamp"]:
+            with open(self._path(symbol, interval, column), "ab") as f:
+                f.write(np.ascontiguousarray(bars[column], dtype=columns[column]).tobytes())
+        return len(bars["timestamp"])
+
+    def _rewrite(self, symbol: str, interval: str, bars: Dict[str, np.ndarray]) -> int:
+        """Replace all stored bars of a symbol: write a new directory and swap it in."""
+        directory = os.path.dirname(self._path(symbol, interval, "timestamp"))
+        staging, old = f"{directory}.new", f"{directory}.old"
+        for leftover in (staging, old):
+            shutil.rmtree(leftover, ignore_errors=True)
+        os.makedirs(staging)
+        for column, dtype in columns.items():
+            with open(os.path.join(staging, f"{column}.bin"), "wb") as f:
+                f.write(np.ascontiguousarray(bars[column], dtype=dtype).tobytes())
+        if os.path.isdir(directory):
+            os.rename(directory, old)  # open memmaps keep reading the old files
+        os.rename(staging, directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return len(bars["timestamp"])
+
+    @staticmethod
+    def _adjustment_changed(stored: Dict[str, np.ndarray], bars: Dict[str, np.ndarray]) -> bool:
+        """Whether the downloaded copy of the last complete stored bar has a different adjusted close,
+        i.e. a split or dividend since the last update rescaled the history."""
+        if len(stored["timestamp"]) < 2:
+            return False
+        overlap = np.flatnonzero(bars["timestamp"] == stored["timestamp"][-2])
+        if not len(overlap):
+            return False
+        return not np.isclose(bars["close"][overlap[0]], stored["close"][-2], rtol=1e-4)
+
+    def update(self, symbol: str, interval: str = "1d", force: bool = False) -> int:
+        """Download only the bars missing after the last stored one, or the whole series again
+        when the adjusted prices changed.
+        Returns:
+            int: The number of appended (or rewritten) bars.
+        """
+        symbol = symbol.upper()
+        key = (symbol, interval)
+        with self._lock(symbol, interval):
+            if not force and time.time() - self._checked_at.get(key, 0) < refresh_after.get(interval, 60):
+                return 0
+            stored = self.load(symbol, interval)
+            timestamps = stored["timestamp"]
+            # start at the last complete bar, it is compared against the stored one
+            start = int(timestamps[max(len(timestamps) - 2, 0)]) if len(timestamps) else None
+            bars = self._fetch(symbol, interval, start)
+            if self._adjustment_changed(stored, bars):
+                logger.info(f"---*--- Adjusted prices of {symbol} changed, downloading all {interval} bars again ---*---")
+                bars = self._fetch(symbol, interval, None)
+                appended = self._rewrite(symbol, interval, bars) if len(bars["timestamp"]) else 0
+            else:
+                appended = self._write(symbol, interval, stored, bars) if len(bars["timestamp"]) else 0
+            self._checked_at[key] = time.time()
+        if appended:
+            logger.info(f"---*--- Stored {appended} new {interval} bars for {symbol} ---*---")
+        return appended
+
+    def update_many(self, symbols: Iterable[str], interval: str = "1d") -> int:
+        """Update several symbols at once, the downloads of stale or missing symbols run concurrently.
+        Returns:
+            int: The number of appended (or rewritten) bars over all symbols.
+        """
+        return sum(_update_executor.map(lambda symbol: self.update(symbol, interval), list(symbols)))
+
+    def get_bars(self, symbol: str, period: str = "1mo", interval: str = "1d", warmup: int = 0) -> Dict[str, np.ndarray]:
+        """Bars of a period as zero-copy slices of the mapped columns, refreshed first if stale.
+        Args:
+            symbol (str): The stock symbol.
+            period (str): The period, e.g. 5d, 1mo, 1y, ytd, max.
+            interval (str): The bar interval, e.g. 1d, 1h, 5m.
+            warmup (int): Extra bars before the period start, e.g. for moving averages.
+        """
+        start = period_start(period)
+        with self._lock(symbol.upper(), interval):  # never load while a rewrite swaps the files
+            self.update(symbol, interval)
+            bars = self.load(symbol, interval)
+        first = max(int(np.searchsorted(bars["timestamp"], start)) - warmup, 0)
+        return {column: values[first:] for column, values in bars.items()}
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    out = np.empty(len(values))
+    alpha = 2.0 / (span + 1.0)
+    level = values[0] if len(values) else 0.0
+    for i, value in enumerate(values):
+        level = alpha * value + (1.0 - alpha) * level
+        out[i] = level
+    return out
+
+
+def rsi(values: np.ndarray, window: int = 14) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return out
+    change = np.diff(values)
+    gains, losses = np.clip(change, 0, None), np.clip(-change, 0, None)
+    avg_gain, avg_loss = gains[:window].mean(), losses[:window].mean()
+    for i in range(window, len(values)):
+        if i > window:  # Wilder smoothing
+            avg_gain = (avg_gain * (window - 1) + gains[i - 1]) / window
+            avg_loss = (avg_loss * (window - 1) + losses[i - 1]) / window
+        out[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+def _bar_time(timestamp: int, interval: str) -> str:
+    moment = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+    return moment.strftime("%Y-%m-%d") if interval.endswith("d") else moment.strftime("%Y-%m-%d %H:%M")
+
+
+def _value(value: float, digits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+class PriceHistoryTools(Toolkit):
+    def __init__(self, store: Optional[PriceStore] = None, **kwargs):
+        super().__init__(name="price_history_tools", **kwargs)
+        self.store = store or price_store
+        self.register(self.get_historical_stock_prices)
+        self.register(self.get_technical_indicators)
+
+    def get_historical_stock_prices(self, symbol: str, period: str = "1mo", interval: str = "1d") -> str:
+        """Use this function to get the historical stock price for a given symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+            period (str): The period for which to retrieve historical prices. Defaults to "1mo".
+                        Valid periods: 1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max
+            interval (str): The interval between data points. Defaults to "1d".
+                        Valid intervals: 1m,5m,15m,30m,1h,1d
+
+        Returns:
+          str: The historical stock price or error message.
+        """
+        if interval not in max_history:
+            return f"Error fetching historical prices for {symbol}: invalid interval '{interval}'"
+        try:
+            bars = self.store.get_bars(symbol, period, interval)
+        except Exception as e:
+            return f"Error fetching historical prices for {symbol}: {e}"
+        if not len(bars["timestamp"]):
+            return f"No historical prices found for {symbol}"
+        history = {
+            _bar_time(bars["timestamp"][i], interval): {
+                "Open": _value(bars["open"][i]),
+                "High": _value(bars["high"][i]),
+                "Low": _value(bars["low"][i]),
+                "Close": _value(bars["close"][i]),
+                "Volume": _value(bars["volume"][i], 0),
+            }
+            for i in range(len(bars["timestamp"]))
+        }
+        return json.dumps(history, indent=2)
+
+    def get_technical_indicators(self, symbol: str, period: str = "3mo") -> str:
+        """Use this function to get technical indicators for a given stock symbol:
+        close, SMA 20/50, EMA 12/26, MACD and RSI 14 per day.
+
+        Args:
+            symbol (str): The stock symbol.
+            period (str): The time period for which to retrieve technical indicators.
+                Valid periods: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max. Defaults to 3mo.
+
+        Returns:
+          str: JSON with the technical indicators per day or an error message.
+        """
+        warmup = 100  # enough history for the 50 day average and smoothed RSI on the first day shown
+        try:
+            bars = self.store.get_bars(symbol, period, "1d", warmup=warmup)
+        except Exception as e:
+            return f"Error fetching technical indicators for {symbol}: {e}"
+        close = np.asarray(bars["close"])
+        if not len(close):
+            return f"No price data found for {symbol}"
+
+        start = int(np.searchsorted(bars["timestamp"], period_start(period)))
+        macd = ema(close, 12) - ema(close, 26)
+        indicators = {
+            "Close": close,
+            "SMA_20": sma(close, 20),
+            "SMA_50": sma(close, 50),
+            "EMA_12": ema(close, 12),
+            "EMA_26": ema(close, 26),
+            "MACD": macd,
+            "MACD_Signal": ema(macd, 9),
+            "RSI_14": rsi(close, 14),
+        }
+        result = {
+            _bar_time(bars["timestamp"][i], "1d"): {name: _value(values[i]) for name, values in indicators.items()}
+            for i in range(start, len(close))
+        }
+        return json.dumps(result, indent=2)
+
+
+# one store per process, shared by every team
+price_store = PriceStore()
@@ -0,0 +1,152 @@
+'''
+Background execution of team runs.
+Runs are submitted to a worker pool instead of running inside the Streamlit script, so a rerun
+(widget click, tab switch) no longer interrupts or blocks the answer. Every run gets a run id and
+buffers its streamed content and tool calls; the UI keeps the run id in the session state and
+reattaches to the buffered run after a rerun.
+The pool is shared by all browser sessions of the process and is bounded: at most
+`max_concurrent_runs` runs execute at once, at most `max_queued_runs` wait for a worker,
+and every chat session has at most one run in flight.
+'''
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from agno.team.team import Team
+from agno.utils.log import logger
+
+from Team_leader import count_storage_reads, storage_read_metrics
+
+max_concurrent_runs = 4
+max_queued_runs = 16
+finished_run_ttl = 600  # seconds a finished run stays available for reattaching
+
+
+class RunQueueFull(Exception):
+    """Raised when no more runs can be accepted."""
+
+
+class RunHandle:
+    """Buffered state of a single run, shared between the worker thread and the UI."""
+
+    def __init__(self, session_id: str, question: str):
+        self.run_id = str(uuid4())
+        self.session_id = session_id
+        self.question = question
+        self.status = "queued"  # queued -> running -> done | error
+        self.content = ""
+        self.tools: Optional[List[Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._version = 0
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "error")
+
+    def _update(self, **fields) -> None:
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._version += 1
+            self._changed.notify_all()
+
+    def _append(self, content: Optional[str], tools: Optional[List[Any]]) -> None:
+        with self._changed:
+            if content:
+                self.content += content
+            if tools:
+                self.tools = tools
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait_for_update(self, seen_version: int, timeout: float = 0.5) -> int:
+        """Block until the run changed after `seen_version` (or it's done / timeout). Returns the new version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != seen_version or self.done, timeout=timeout)
+            return self._version
+
+
+class RunManager:
+    def __init__(self, max_workers: int = max_concurrent_runs, max_queued: int = max_queued_runs):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="team-run")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._runs: Dict[str, RunHandle] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, team: Team, question: str, on_done: Optional[Callable[[Team], Any]] = None) -> RunHandle:
+        """Queue `team.run(question)` on the worker pool.
+        Args:
+            team (Team): The team leader of the chat session.
+            question (str): The user prompt.
+            on_done (Callable): Optional callback called with the team in the worker after a successful run.
+        Returns:
+            RunHandle: The handle to follow the run with.
+        Raises:
+            RunQueueFull: If the session already has a run in flight or the queue is full.
+        """
+        with self._lock:
+            self._prune()
+            if any(not run.done and run.session_id == team.session_id for run in self._runs.values()):
+                raise RunQueueFull("this chat is still answering the previous question")
+            if not self._slots.acquire(blocking=False):
+                raise RunQueueFull("too many questions are being answered right now, try again shortly")
+            handle = RunHandle(session_id=team.session_id, question=question)
+            self._runs[handle.run_id] = handle
+        logger.info(f"---*--- Queued run {handle.run_id} for session {handle.session_id} ---*---")
+        # storage reads of the run count for the interaction that asked the question
+        self._executor.submit(self._execute, team, handle, on_done, storage_read_metrics())
+        return handle
+
+    def get(self, run_id: Optional[str]) -> Optional[RunHandle]:
+        if not run_id:
+            return None
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def active_session_ids(self) -> List[str]:
+        with self._lock:
+            return [run.session_id for run in self._runs.values() if not run.done]
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [
+            run_id
+            for run_id, run in self._runs.items()
+            if run.done and run.finished_at and now - run.finished_at > finished_run_ttl
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+    def _execute(
+        self,
+        team: Team,
+        handle: RunHandle,
+        on_done: Optional[Callable[[Team], Any]],
+        read_metrics: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        count_storage_reads(read_metrics)
+        try:
+            handle._update(status="running")
+            for _resp_chunk in team.run(handle.question, stream=True):
+                handle._append(_resp_chunk.content, _resp_chunk.tools)
+            tools = team.run_response.tools if team.run_response else handle.tools
+            handle._update(tools=tools or handle.tools)
+            if on_done:
+                on_done(team)
+            handle._update(status="done", finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Error during agent run: {str(e)}\n{traceback.format_exc()}")
+            handle._update(status="error", error=str(e), finished_at=time.time())
+        finally:
+            count_storage_reads(None)
+            self._slots.release()
+
+
+# one pool per process, shared by every browser session
+run_manager = RunManager()
@@ -0,0 +1,290 @@
+'''
+Session controller for the chat sessions of a browser session.
+Every change goes through one explicit event: "new", "select", "rename" or "delete".
+Widgets only dispatch events from their on_click/on_change callbacks. Streamlit runs callbacks
+before the script, so each change is applied exactly once and the following script run already
+renders the new state, without st.rerun() or flags carried between runs.
+The list of stored sessions is cached and only re-read when the sessions table changed (row count
+or latest updated_at, one cheap aggregate query), e.g. when a chat was created in another tab.
+Changes made here update the cached list directly and are marked as seen.
+`session_metrics` counts script runs and storage reads per interaction. An interaction starts only
+with user input (every widget has a callback calling `user_input` or `dispatch`); any other script
+run is added to the current interaction, so it can be checked that one click costs one run. Reads are counted by the
+storage itself, so agno's own reads and the ones of a run in the worker pool are included.
+'''
+import traceback
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+from agno.team.team import Team
+from agno.utils.log import logger
+
+import session_search
+from Team_leader import count_storage_reads, get_team_leader
+from run_manager import run_manager
+from utils import add_message, reset_chat_view
+
+session_events = ("new", "select", "rename", "delete")
+
+
+####################################################################
+# Interaction metrics
+####################################################################
+def session_metrics() -> Dict[str, Any]:
+    return st.session_state.setdefault(
+        "session_metrics", {"interaction": 0, "event": None, "reruns": 0, "storage_reads": 0}
+    )
+
+
+def start_interaction(event: str, in_script_run: bool = False) -> None:
+    """Reset the counters. Callbacks run before the script run they trigger; events detected
+    inside a script run (first load, model change) count that run already."""
+    metrics = {
+        "interaction": session_metrics()["interaction"] + 1,
+        "event": event,
+        "reruns": 1 if in_script_run else 0,
+        "storage_reads": 0,
+    }
+    st.session_state["session_metrics"] = metrics
+    count_storage_reads(metrics)
+
+
+def user_input(event: str) -> None:
+    """Widget callback for user input that isn't a session event, e.g. a question or the model selector."""
+    start_interaction(event)
+
+
+def count_script_run() -> None:
+    """Call once at the top of every script run. The run counts for the interaction started by the
+    last user input, so an extra rerun shows up as a second run of the same interaction."""
+    metrics = session_metrics()
+    metrics["reruns"] += 1
+    count_storage_reads(metrics)
+
+
+####################################################################
+# Session state
+####################################################################
+def _messages_from_runs(team: Team) -> None:
+    st.session_state["messages"] = []
+    agent_runs = team.memory.runs if getattr(team, "memory", None) is not None else []
+    for _run in agent_runs:
+        if hasattr(_run, "message") and _run.message is not None:
+            add_message(_run.message.role, _run.message.content)
+        if hasattr(_run, "response") and _run.response is not None:
+            add_message("assistant", _run.response.content, _run.response.tools)
+
+
+def _open_session(model_id: str, session_id: Optional[str] = None) -> Team:
+    """Create the team for a stored session (or a new one) and make it the current session."""
+    logger.info(f"---*--- Loading {model_id} run: {session_id or 'new session'} ---*---")
+    if st.session_state.get("team_agent") is not None:
+        _list_saved_session(st.session_state["team_agent"])
+    team = get_team_leader(model_id=model_id, session_id=session_id)
+    if session_id:
+        team.load_session()
+    st.session_state["team_agent"] = team
+    st.session_state["current_model"] = model_id
+    st.session_state["team_agent_session_id"] = team.session_id
+    st.session_state["pending_prompts"] = []  # queued questions belong to the previous chat
+    _messages_from_runs(team)
+    reset_chat_view()
+    return team
+
+
+def ensure_team(model_id: str) -> Team:
+    """Return the team of the current session, creating a new session on first use or model change."""
+    team = st.session_state.get("team_agent")
+    if team is None or st.session_state.get("current_model") != model_id:
+        if team is None:  # a model change was started by the selector callback already
+            start_interaction("load", in_script_run=True)
+        logger.info("---*--- Creating new Team Agent ---*---")
+        team = _open_session(model_id)
+    return team
+
+
+def reload_session(team: Team) -> None:
+    """Reload the team memory and messages from storage, e.g. after idle eviction."""
+    team.load_session(force=True)
+    _messages_from_runs(team)
+
+
+def _sessions_version(team: Team) -> Any:
+    sessions_version = getattr(team.storage, "sessions_version", None)
+    return sessions_version() if sessions_version else None
+
+
+def mark_sessions_seen(team: Team) -> None:
+    """Call after this browser session changed the sessions table and updated the cached list itself,
+    so the change doesn't trigger a re-read of all sessions."""
+    if st.session_state.get("session_options") is not None:
+        _list_saved_session(team)
+        st.session_state["session_options_version"] = _sessions_version(team)
+
+
+def session_options(team: Team) -> List[Dict[str, str]]:
+    options = st.session_state.get("session_options")
+    version = _sessions_version(team)
+    if options is None or version != st.session_state.get("session_options_version"):
+        options = []
+        if team.storage:  # all teams have a storage
+            for session in team.storage.get_all_sessions():
+                session_name = session.session_data.get("session_name", None) if session.session_data else None
+                options.append({"id": session.session_id, "display": session_name if session_name else "New Chat"})
+        st.session_state["session_options"] = options
+        st.session_state["session_options_version"] = version
+    if not _list_saved_session(team):  # not saved yet
+        options = [{"id": team.session_id, "display": team.session_name or "New Chat"}] + options
+    return options
+
+
+def _list_saved_session(team: Team) -> bool:
+    """Add a session saved by its first run to the cached list, without re-reading storage.
+    Returns whether the session is listed."""
+    options = st.session_state.get("session_options")
+    if options is None or any(option["id"] == team.session_id for option in options):
+        return options is not None
+    if getattr(team, "memory", None) is None or not team.memory.runs:
+        return False
+    options.insert(0, {"id": team.session_id, "display": team.session_name or "New Chat"})
+    return True
+
+
+def dispatch(event: str, session_id: Optional[str] = None, session_name: Optional[str] = None) -> None:
+    """Apply a session event once. Used as widget callback.
+    Args:
+        event (str): One of "new", "select", "rename", "delete".
+        session_id (str): Session to select, defaults to the session selector value.
+        session_name (str): New name, defaults to the rename input value.
+    """
+    if event not in session_events:
+        raise ValueError(f"Unknown session event '{event}'")
+    start_interaction(event)
+    st.session_state.pop("session_error", None)
+    team: Team = st.session_state["team_agent"]
+    model_id = st.session_state["current_model"]
+    try:
+        if event == "new":
+            _open_session(model_id)
+        elif event == "select":
+            session_id = session_id or st.session_state.get("session_selector")
+            if session_id and session_id != team.session_id:
+                _open_session(model_id, session_id)
+        elif event == "rename":
+            session_name = session_name or st.session_state.get("session_name_input")
+            if team.session_id in run_manager.active_session_ids():
+                # rename_session reloads and saves the session of the team the run is using
+                raise RuntimeError("the chat is still answering, rename it once the answer is done")
+            if session_name:
+                team.rename_session(session_name)
+                session_search.rename_session(team.session_id, session_name)
+                for option in st.session_state.get("session_options") or []:  # no need to re-read the list
+                    if option["id"] == team.session_id:
+                        option["display"] = session_name
+                mark_sessions_seen(team)
+                st.session_state["session_edit_mode"] = False
+        elif event == "delete":
+            st.session_state["want_delete"] = False
+            if team.session_id in run_manager.active_session_ids():
+                raise RuntimeError("the chat is still answering, delete it once the answer is done")
+            team.delete_session(team.session_id)
+            session_search.remove_session(team.session_id)
+            if st.session_state.get("session_options") is not None:
+                st.session_state["session_options"] = [
+                    option for option in st.session_state["session_options"] if option["id"] != team.session_id
+                ]
+                st.session_state["session_options_version"] = _sessions_version(team)
+            st.session_state["team_agent"] = None  # gone, must not be listed again as an unsaved session
+            _open_session(model_id)
+    except Exception as e:
+        logger.error(f"Error handling session event '{event}': {str(e)}\n{traceback.format_exc()}")
+        st.session_state["session_error"] = f"Error ({event}): {str(e)}"
+
+
+####################################################################
+# Widgets
+####################################################################
+def _set_flag(name: str, value: bool) -> None:
+    start_interaction(name)
+    st.session_state[name] = value
+
+
+def session_selector_widget(team: Team) -> None:
+    options = session_options(team)
+    names = {option["id"]: option["display"] for option in options}
+    if st.session_state.get("session_selector") != team.session_id:
+        st.session_state["session_selector"] = team.session_id  # follow events from other widgets
+    st.sidebar.selectbox(
+        "Session",
+        options=list(names),
+        format_func=lambda s_id: names.get(s_id, s_id),
+        key="session_selector",
+        on_change=dispatch,
+        args=("select",),
+    )
+    if st.session_state.get("session_error"):
+        st.sidebar.error(st.session_state["session_error"])
+
+
+def new_chat_button() -> None:
+    st.sidebar.button("🔄 New Chat", use_container_width=True, on_click=dispatch, args=("new",))
+
+
+def delete_session_widget() -> None:
+    st.sidebar.button(
+        "🗑️ Delete Current Chat", use_container_width=True, on_click=_set_flag, args=("want_delete", True)
+    )
+    if st.session_state.get("want_delete"):
+        st.sidebar.warning("Are you sure you want to delete this chat?")
+        col3, col4 = st.sidebar.columns(2)
+        with col3:
+            st.button("✅ Yes", key="confirm_delete_yes", on_click=dispatch, args=("delete",))
+        with col4:
+            st.button("❌ Cancel", key="confirm_delete_no", on_click=_set_flag, args=("want_delete", False))
+
+
+def rename_session_widget(team: Team) -> None:
+    st.sidebar.button("✎ Rename Session", on_click=_set_flag, args=("session_edit_mode", True))
+    if st.session_state.get("session_edit_mode"):
+        st.sidebar.text_input(
+            "Enter new name:", value=team.session_name, key="session_name_input", on_change=user_input, args=("type name",)
+        )
+        st.sidebar.button("Save", type="primary", on_click=dispatch, args=("rename",))
+
+
+def session_search_widget(team: Team) -> None:
+    query = st.sidebar.text_input(
+        "🔍 Search chats",
+        key="session_search_query",
+        placeholder="e.g. NVDA target price",
+        on_change=user_input,
+        args=("search",),
+    )
+    if not query:
+        return
+
+    session_search.backfill_index(team.storage)
+    results = session_search.search_sessions(query)
+    if not results:
+        st.sidebar.caption("No matching chats.")
+        return
+
+    for i, result in enumerate(results):
+        st.sidebar.button(
+            result["session_name"],
+            key=f"session_search_result_{i}",
+            use_container_width=True,
+            on_click=dispatch,
+            args=("select",),
+            kwargs={"session_id": result["session_id"]},
+        )
+        st.sidebar.caption(result["snippet"])
+
+
+def session_metrics_widget() -> None:
+    metrics = session_metrics()
+    if metrics["event"]:
+        st.sidebar.caption(
+            f"🔁 Last interaction ({metrics['event']}): {metrics['reruns']} script run(s), "
+            f"{metrics['storage_reads']} storage read(s)"
+        )
@@ -0,0 +1,150 @@
+'''
+Memory accounting and idle eviction for browser sessions.
+Every browser session keeps its own Team (with members) in `st.session_state`, and the team memory
+grows with every run (messages, tool results, member responses). This registry estimates how much
+memory each session holds and, for sessions idle longer than `idle_session_ttl`, drops the
+in-memory state of their team and their chat messages. Nothing is lost: the team reloads its
+session from storage on the next rerun of that browser session.
+'''
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional
+
+from agno.team.team import Team
+from agno.utils.log import logger
+
+idle_session_ttl = 30 * 60  # seconds without a rerun before a session's team memory is dropped
+_max_size_depth = 12
+
+
+class _SessionEntry:
+    def __init__(self, team: Team, messages: List[Dict[str, Any]]):
+        self.team_ref = weakref.ref(team)
+        self.messages = messages  # the same list as st.session_state["messages"], cleared on eviction
+        self.last_seen = time.time()
+        self.size_key: Optional[tuple] = None
+        self.bytes = 0
+        self.evicted = False
+
+
+_sessions: Dict[str, _SessionEntry] = {}
+_lock = threading.Lock()
+
+
+def _approx_size(obj: Any, seen: set, depth: int = 0) -> int:
+    """Rough deep size in bytes of dicts, lists and plain/pydantic objects."""
+    if id(obj) in seen or depth > _max_size_depth:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(_approx_size(k, seen, depth + 1) + _approx_size(v, seen, depth + 1) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return size + sum(_approx_size(item, seen, depth + 1) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return size + _approx_size(vars(obj), seen, depth + 1)
+    return size
+
+
+def _memories(team: Team) -> List[Any]:
+    memories = [getattr(team, "memory", None)]
+    memories += [getattr(member, "memory", None) for member in getattr(team, "members", None) or []]
+    return [memory for memory in memories if memory is not None]
+
+
+def _runs_count(team: Team) -> int:
+    return sum(len(getattr(memory, "runs", None) or []) for memory in _memories(team))
+
+
+def estimate_session_bytes(team: Team, messages: List[Dict[str, Any]]) -> int:
+    """Estimate the memory held by a browser session: the chat messages plus the runs and
+    messages kept in team and member memory (the parts that grow with every question)."""
+    seen: set = set()
+    size = _approx_size(messages, seen)
+    for memory in _memories(team):
+        for attr in ("runs", "messages"):
+            size += _approx_size(getattr(memory, attr, None), seen)
+    return size
+
+
+def release_team_memory(team: Team) -> None:
+    """Drop the in-memory runs of a team and its members. The session stays in storage."""
+    for memory in _memories(team):
+        for attr in ("runs", "messages"):
+            if isinstance(getattr(memory, attr, None), list):
+                setattr(memory, attr, [])
+    if hasattr(team, "team_session"):
+        team.team_session = None  # forces the next load_session() to read from storage
+
+
+def track_session(
+    session_key: str, team: Team, messages: List[Dict[str, Any]], busy_session_ids: Iterable[str] = ()
+) -> bool:
+    """Record activity of a browser session and update its memory estimate.
+    Args:
+        session_key (str): Unique key of the browser session.
+        team (Team): The team held by the session.
+        messages (list): The chat messages held by the session.
+        busy_session_ids: Chat session ids with a run in flight. Their team memory is being written
+            by a worker thread, so it is measured again once the run is done.
+    Returns:
+        bool: True if the team memory was evicted while the session was idle, so the
+        caller should drop its derived state (messages) and reload from storage.
+    """
+    with _lock:
+        entry = _sessions.get(session_key)
+        if entry is None or entry.team_ref() is not team:
+            entry = _SessionEntry(team, messages)
+            _sessions[session_key] = entry
+        entry.messages = messages  # switching chats replaces the list
+        was_evicted, entry.evicted = entry.evicted, False
+        entry.last_seen = time.time()
+
+        # re-measure only when something was added or removed, and never during a run
+        size_key = (len(messages), _runs_count(team))
+        if size_key != entry.size_key and team.session_id not in set(busy_session_ids):
+            entry.size_key = size_key
+            entry.bytes = estimate_session_bytes(team, messages)
+        return was_evicted
+
+
+def evict_idle_sessions(busy_session_ids: Iterable[str] = ()) -> int:
+    """Release team memory of sessions idle for longer than `idle_session_ttl`.
+    Args:
+        busy_session_ids: Chat session ids with a run in flight, those are never touched.
+    Returns:
+        int: The number of evicted sessions.
+    """
+    busy = set(busy_session_ids)
+    now = time.time()
+    evicted = 0
+    with _lock:
+        for session_key, entry in list(_sessions.items()):
+            team = entry.team_ref()
+            if team is None:  # the browser session is gone
+                del _sessions[session_key]
+                continue
+            if entry.evicted or now - entry.last_seen < idle_session_ttl or team.session_id in busy:
+                continue
+            release_team_memory(team)
+            entry.messages.clear()  # rebuilt from storage by the caller on the next rerun
+            entry.evicted, entry.bytes, entry.size_key = True, 0, None
+            evicted += 1
+    if evicted:
+        logger.info(f"---*--- Released memory of {evicted} idle session(s) ---*---")
+    return evicted
+
+
+def memory_report(session_key: Optional[str] = None) -> Dict[str, int]:
+    """Memory accounting of this process: bytes of the given session, all sessions and their count."""
+    with _lock:
+        entry = _sessions.get(session_key) if session_key else None
+        return {
+            "session_bytes": entry.bytes if entry else 0,
+            "total_bytes": sum(e.bytes for e in _sessions.values()),
+            "sessions": len(_sessions),
+        }
@@ -0,0 +1,235 @@
+'''
+Full-text search over past chat sessions.
+Keeps an SQLite FTS5 index next to the team storage table (same db file) with one row per
+user prompt / assistant answer. The index is updated incrementally after each run: only the
+runs that were not indexed yet are inserted, so the cost per question stays constant.
+'''
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from agno.utils.log import logger
+
+from Team_leader import Storage_db_file, db_table_name
+
+fts_table_name = f"{db_table_name}_fts"
+fts_state_table_name = f"{db_table_name}_fts_state"
+
+_lock = threading.Lock()
+_backfilled = False
+
+
+def _connect(db_file: str = Storage_db_file) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table_name} USING fts5("
+        "session_id UNINDEXED, run_index UNINDEXED, role UNINDEXED, content, "
+        "tokenize='porter unicode61')"
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {fts_state_table_name} ("
+        "session_id TEXT PRIMARY KEY, session_name TEXT, indexed_runs INTEGER NOT NULL DEFAULT 0)"
+    )
+    return conn
+
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def iter_run_messages(run: Any) -> Iterator[Tuple[str, str]]:
+    """Yield (role, content) pairs of the user prompt and assistant answer of a run.
+    Handles both in-memory runs (message/response objects) and runs read back from storage (dicts).
+    """
+    messages = _field(run, "messages")
+    if messages:
+        for msg in messages:
+            role, content = _field(msg, "role"), _field(msg, "content")
+            if content and role in ("user", "assistant"):
+                yield role, str(content)
+        return
+
+    message = _field(run, "message")
+    if message is not None and _field(message, "content"):
+        yield "user", str(_field(message, "content"))
+
+    response = _field(run, "response")
+    answer = _field(response, "content") if response is not None else _field(run, "content")
+    if answer:
+        yield "assistant", str(answer)
+
+
+def _session_runs(session: Any) -> List[Any]:
+    memory = _field(session, "memory")
+    runs = _field(memory, "runs") if memory else None
+    return list(runs or [])
+
+
+def _session_name(session: Any) -> Optional[str]:
+    session_data = _field(session, "session_data")
+    return session_data.get("session_name") if session_data else None
+
+
+def _index_runs(
+    conn: sqlite3.Connection, session_id: str, session_name: Optional[str], runs: List[Any], complete: bool = True
+) -> int:
+    row = conn.execute(
+        f"SELECT indexed_runs FROM {fts_state_table_name} WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    indexed_runs = row[0] if row else 0
+    if indexed_runs > len(runs):
+        if not complete:  # in-memory runs may have been released, the index is still valid
+            return 0
+        conn.execute(f"DELETE FROM {fts_table_name} WHERE session_id = ?", (session_id,))  # session was rewritten
+        indexed_runs = 0
+
+    rows = [
+        (session_id, run_index, role, content)
+        for run_index, run in enumerate(runs[indexed_runs:], start=indexed_runs)
+        for role, content in iter_run_messages(run)
+    ]
+    conn.executemany(
+        f"INSERT INTO {fts_table_name} (session_id, run_index, role, content) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.execute(
+        f"INSERT INTO {fts_state_table_name} (session_id, session_name, indexed_runs) VALUES (?, ?, ?) "
+        "ON CONFLICT(session_id) DO UPDATE SET session_name = excluded.session_name, "
+        "indexed_runs = excluded.indexed_runs",
+        (session_id, session_name, len(runs)),
+    )
+    return len(rows)
+
+
+def _index(session_id: str, session_name: Optional[str], runs: List[Any], complete: bool, db_file: str) -> int:
+    with _lock:
+        conn = _connect(db_file)
+        try:
+            with conn:
+                return _index_runs(conn, session_id, session_name, runs, complete)
+        finally:
+            conn.close()
+
+
+def index_session(session: Any, db_file: str = Storage_db_file) -> int:
+    """Add the not yet indexed runs of a stored team session to the search index.
+    Args:
+        session: A session as returned by `storage.read()` / `storage.get_all_sessions()`.
+        db_file (str): The Sqlite database file holding the index.
+    Returns:
+        int: The number of messages added to the index.
+    """
+    session_id = _field(session, "session_id")
+    if not session_id:
+        return 0
+    return _index(session_id, _session_name(session), _session_runs(session), True, db_file)
+
+
+def index_team_session(team: Any, db_file: str = Storage_db_file) -> int:
+    """Index the latest runs of the team's current session. Called after each run.
+    The new runs are already in the team memory, so this doesn't read the session from storage."""
+    if not team.session_id or getattr(team, "memory", None) is None:
+        return 0
+    try:
+        return _index(team.session_id, team.session_name, list(team.memory.runs or []), False, db_file)
+    except Exception as e:
+        logger.error(f"Error indexing session {team.session_id}: {str(e)}")
+        return 0
+
+
+def rename_session(session_id: str, session_name: str, db_file: str = Storage_db_file) -> None:
+    with _lock:
+        conn = _connect(db_file)
+        try:
+            with conn:
+                conn.execute(
+                    f"UPDATE {fts_state_table_name} SET session_name = ? WHERE session_id = ?",
+                    (session_name, session_id),
+                )
+        finally:
+            conn.close()
+
+
+def remove_session(session_id: str, db_file: str = Storage_db_file) -> None:
+    with _lock:
+        conn = _connect(db_file)
+        try:
+            with conn:
+                conn.execute(f"DELETE FROM {fts_table_name} WHERE session_id = ?", (session_id,))
+                conn.execute(f"DELETE FROM {fts_state_table_name} WHERE session_id = ?", (session_id,))
+        finally:
+            conn.close()
+
+
+def backfill_index(storage: Any, db_file: str = Storage_db_file) -> None:
+    """Index every stored session once per process, so sessions created before the
+    index existed are searchable too. Later updates go through `index_team_session`."""
+    global _backfilled
+    if _backfilled or storage is None:
+        return
+    try:
+        for session in storage.get_all_sessions():
+            index_session(session, db_file)
+        _backfilled = True
+    except Exception as e:
+        logger.error(f"Error building search index: {str(e)}")
+
+
+def _to_match_query(query: str) -> str:
+    # quote every term so user input can't break the FTS5 query syntax, prefix-match the last one
+    terms = [t.replace('"', '""') for t in query.split() if t.strip('"')]
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_sessions(query: str, limit: int = 10, db_file: str = Storage_db_file) -> List[Dict[str, Any]]:
+    """Search user prompts and assistant answers of all sessions.
+    Args:
+        query (str): Free text, all terms must match (the last one as a prefix).
+        limit (int): Maximum number of sessions returned.
+        db_file (str): The Sqlite database file holding the index.
+    Returns:
+        List[Dict[str, Any]]: Sessions ranked by their best matching message (bm25), each with
+        "session_id", "session_name", "role", "snippet" and "score".
+    """
+    match_query = _to_match_query(query)
+    if not match_query:
+        return []
+    with _lock:
+        conn = _connect(db_file)
+        try:
+            # best hit per session in SQL, so a session with many hits can't crowd out the others.
+            # "LIMIT -1" keeps SQLite from flattening bm25() into the aggregate (not allowed there);
+            # MIN() makes the bare rowid column come from the best row.
+            rows = conn.execute(
+                f"WITH hits AS (SELECT session_id, rowid AS hit, bm25({fts_table_name}) AS score "
+                f"FROM {fts_table_name} WHERE {fts_table_name} MATCH ? LIMIT -1), "
+                "best AS (SELECT session_id, hit, MIN(score) AS score FROM hits "
+                "GROUP BY session_id ORDER BY score LIMIT ?) "
+                f"SELECT b.session_id, s.session_name, f.role, "
+                f"snippet({fts_table_name}, 3, '**', '**', ' … ', 12), b.score "
+                f"FROM best b JOIN {fts_table_name} f ON f.rowid = b.hit "
+                f"LEFT JOIN {fts_state_table_name} s ON s.session_id = b.session_id "
+                f"WHERE {fts_table_name} MATCH ? ORDER BY b.score",
+                (match_query, limit, match_query),
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.error(f"Search error for '{query}': {str(e)}")
+            return []
+        finally:
+            conn.close()
+
+    return [
+        {
+            "session_id": session_id,
+            "session_name": session_name or "New Chat",
+            "role": role,
+            "snippet": snippet,
+            "score": score,
+        }
+        for session_id, session_name, role, snippet, score in rows
+    ]
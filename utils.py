@@ -1,10 +1,6 @@
 from typing import Any, Dict, List, Optional
 
 import streamlit as st
-from Team_leader import get_team_leader
-from agno.team.team import Team
-from agno.utils.log import logger
-import traceback
 
 #appends messages to the session messages. Not showing them.
 def add_message( 
@@ -32,6 +28,9 @@ def export_chat_history():
     return ""
 
 
+CHAT_WINDOW_SIZE = 20  # number of latest messages shown, "load earlier" pages by the same amount
+
+
 def display_tool_calls(tool_calls_container, tools):
     if not tools:
         return
@@ -83,148 +82,38 @@ def display_tool_calls(tool_calls_container, tools):
                     st.json(_metrics)
 
 
-def rename_session_widget(team: Team) -> None:
-    container = st.sidebar.container()
-    if "session_edit_mode" not in st.session_state:
-        st.session_state.session_edit_mode = False
-
-    if st.sidebar.button("✎ Rename Session"):
-        st.session_state.session_edit_mode = True
-        st.rerun()
-
-    if st.session_state.session_edit_mode:
-        new_session_name = st.sidebar.text_input("Enter new name:", value=team.session_name, key="session_name_input")
-        if st.sidebar.button("Save", type="primary"):
-            if new_session_name:
-                try:
-                    team.rename_session(new_session_name)
-                    #team.session_name = new_session_name
-                    st.session_state.session_edit_mode = False
-                    st.session_state["is_renamed_flag"] = True
-                    #print(f"is_renamed_flag set to {st.session_state['is_renamed_flag']}")
-                    st.session_state["can_select_flag"] = False
-                    #print(f"can_select_flag set to {st.session_state['can_select_flag']}")
-                    st.rerun()
-                except Exception as e:
-                    logger.error(f"Error renaming session: {str(e)}\n{traceback.format_exc()}")
-                    st.sidebar.error(f"Error renaming session: {str(e)}")
-
-def load_chat_session(team: Team, model_id: str, selected_session_id: str, same_session_id : Optional[bool] = False) -> None:
-    if team.storage: #all teams have a storage
-        team_sessions = team.storage.get_all_sessions()
-
-        session_options = []
-        for session in team_sessions:
-            session_id = session.session_id
-            session_name = session.session_data.get("session_name", None) if session.session_data else None
-            display_name = session_name if session_name else session_id
-            session_options.append({"id": session_id, "display": display_name})
-
-        #print(f"session_options: {session_options}")
-
-        if session_options:
-            #selected_session = st.sidebar.selectbox("Session", options=[s["display"] for s in session_options], key="session_selector")
-            #selected_session_id = next(s["id"] for s in session_options if s["display"] == selected_session)
-            #selected_session_id= selected_id
-
-            #print(f"existing session_id: {st.session_state.get('team_agent_session_id')} and selected session_id: {selected_session_id}")
-            #if st.session_state.get("team_agent_session_id") != selected_session_id :
-            #print("not same existing session_id and selected")
-            logger.info(f"---*--- Loading {model_id} run: {selected_session_id} ---*---")
-            try:
-                if not same_session_id:
-                    new_team = get_team_leader(session_id=selected_session_id, model_id=model_id)
-                    st.session_state["team_agent"] = new_team
-                    #("not same session name, new team created")
-                
-                
-                st.session_state["team_agent_session_id"] = selected_session_id
-                st.session_state["messages"] = []
-
-                selected_session_obj = next((s for s in team_sessions if s.session_id == selected_session_id), None)
-                if selected_session_obj and selected_session_obj.memory and "runs" in selected_session_obj.memory:
-                    #print("in selector if, runs found")
-                    seen_messages = set()
-                    for run in selected_session_obj.memory["runs"]:
-                        if "messages" in run:
-                            for msg in run["messages"]:
-                                role, content = msg.get("role"), msg.get("content")
-                                if not content or role == "system":
-                                    continue
-                                msg_id = f"{role}:{content}"
-                                if msg_id not in seen_messages:
-                                    seen_messages.add(msg_id)
-                                    if role == "assistant":
-                                        tool_calls = msg.get("tool_calls") or run.get("tools")
-                                        add_message(role, content, tool_calls)
-                                    else:
-                                        add_message(role, content)
-                        elif "message" in run and isinstance(run["message"], dict):
-                            user_msg = run["message"]["content"]
-                            if f"user:{user_msg}" not in seen_messages:
-                                seen_messages.add(f"user:{user_msg}")
-                                add_message("user", user_msg)
-
-                            if "content" in run and run["content"]:
-                                asst_msg = run["content"]
-                                if f"assistant:{asst_msg}" not in seen_messages:
-                                    seen_messages.add(f"assistant:{asst_msg}")
-                                    add_message("assistant", asst_msg, run.get("tools"))
-                #st.rerun()
-              #  for message in st.session_state["messages"]: #show messages in the chat
-              #      if message["role"] in ["user", "assistant"]:
-              #          _content = message["content"]
-               #         if _content:
-                #            with st.chat_message(message["role"]):
-               #                 if "tool_calls" in message and message["tool_calls"]:
-               #                     display_tool_calls(st.empty(), message["tool_calls"])
-                #                st.markdown(_content)
-
-            except Exception as e:
-                logger.error(f"Error switching sessions: {str(e)} \n{traceback.format_exc()}")
-                st.sidebar.error(f"Error loading session: {str(e)}")
-            #else:
-               # print(f"Session already loaded: {selected_session_id}")
-        else:
-            st.sidebar.info("No saved sessions available.")
-
-
-def get_selected(team: Team, default_selected_S_id : Optional[str] = None) -> str:
-    if team.storage: #all teams have a storage
-        team_sessions = team.storage.get_all_sessions()
-
-        session_options = []
-        for session in team_sessions:
-            session_id = session.session_id
-            session_name = session.session_data.get("session_name", None) if session.session_data else None
-            #print(f"session_name: {session_name} and session_id: {session_id}")
-            display_name = session_name if session_name else "New Chat"  # Default display name if session_name is None
-            session_options.append({"id": session_id, "display": display_name})
-
-        #print(f"session_options: {session_options}")
-
-        if session_options:
-            # Compute index of the default session ID if provided
-            default_index = next(
-                (i for i, s in enumerate(session_options) if s["id"] == default_selected_S_id),
-                0  # fallback to first if not found
-            )
-            selected_session = st.sidebar.selectbox(
-                                                    "Session",
-                                                    options=session_options,               # full dicts
-                                                    index=default_index,
-                                                    format_func=lambda s: s["display"],    # what the user sees
-                                                    key="session_selector"
-                                                )
-            #print(f"selected session: {selected_session}")
-            selected_session_id = selected_session["id"]       # no ambiguity            
-            #print(f"selected session_id: {selected_session_id}")
-            return selected_session_id
-        else:
-            st.sidebar.info("No saved sessions available.")
-            #print("slected session_id: None")
-            return None
-        
+def reset_chat_view() -> None:
+    """Go back to showing the latest messages only, e.g. after switching sessions."""
+    st.session_state["chat_window"] = CHAT_WINDOW_SIZE
+
+
+def _load_earlier_messages() -> None:
+    st.session_state["chat_window"] = st.session_state.get("chat_window", CHAT_WINDOW_SIZE) + CHAT_WINDOW_SIZE
+
+
+@st.fragment
+def display_chat_history() -> None:
+    """Show only the latest `chat_window` messages of the chat, so long sessions don't render
+    their whole history on every rerun. Runs as a fragment: "load earlier" only reruns the
+    chat history, not the whole app."""
+    messages = st.session_state.get("messages", [])
+    window = st.session_state.setdefault("chat_window", CHAT_WINDOW_SIZE)
+    hidden = max(len(messages) - window, 0)
+    if hidden:
+        st.button(
+            f"⬆️ Load earlier messages ({hidden} hidden)",
+            key="load_earlier_messages",
+            on_click=_load_earlier_messages,
+        )
+
+    for message in messages[hidden:]:
+        if message["role"] in ["user", "assistant"]:
+            _content = message["content"]
+            if _content:
+                with st.chat_message(message["role"]):
+                    if "tool_calls" in message and message["tool_calls"]:
+                        display_tool_calls(st.empty(), message["tool_calls"])
+                    st.markdown(_content)
 
 
 def about_widget() -> None: